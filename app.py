@@ -1,32 +1,57 @@
 import streamlit as st
 import yfinance as yf
-import feedparser
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
-import plotly.express as px
 from datetime import datetime, timedelta
-import json
+import orjson
 import os
 import concurrent.futures
+import threading
+import queue
+import hashlib
+import pickle
 import time
+import calendar
+import io
+import xml.etree.ElementTree as ET
+from email.utils import parsedate_tz, mktime_tz
+from operator import itemgetter
+from urllib.parse import quote_plus
 import pytz
-import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-
-# --- NLTK SETUP (Auto-Download) ---
-try:
-    nltk.data.find('vader_lexicon')
-except LookupError:
-    nltk.download('vader_lexicon')
 
 # --- CONFIGURATION ---
 st.set_page_config(page_title="Executive Market Radar 19.2", layout="wide", page_icon="🦅")
 WATCHLIST_FILE = "watchlist_data.json"
 TRADING_FILE = "trading_engine.json"
 TRANSACTION_FILE = "transactions.json"
+LOG_COMPACT_BYTES = 64 * 1024
+QUOTE_TTL = 300
+INFO_TTL = 86400
+STATEMENT_TTL = 7 * 86400
+FEED_TTL = 600
+IO_WORKERS = max(1, int(os.environ.get("MR_WORKERS", "16")))
+CACHE_DIR = ".cache"
+SPARK_POINTS = 32
+SCORECARD_KEYS = ('earningsGrowth', 'returnOnEquity')
+JSON_OPTS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+INDIA_PULSE = ["^NSEI", "^BSESN", "^NSEBANK", "GC=F", "SI=F", "CL=F"]
+GLOBAL_PULSE = ["^GSPC", "^IXIC", "BTC-USD", "GC=F", "HG=F", "NG=F"]
+ECON_PULSE = ["USDINR=X", "DX-Y.NYB", "^TNX"]
+INDIA_SECTORS = {"Banks": "^NSEBANK", "IT": "^CNXIT", "Auto": "^CNXAUTO", "Energy": "^CNXENERGY"}
+GLOBAL_SECTORS = {"Tech": "IXN", "Energy": "IXC", "Finance": "IXG"}
+MOVERS_COUNT = 20
+INDIA_LABELS = {"GC=F": "GOLD", "SI=F": "SILVER", "CL=F": "CRUDE OIL", "^NSEI": "NIFTY 50", "^BSESN": "SENSEX"}
+GLOBAL_LABELS = {"HG=F": "COPPER", "NG=F": "NATURAL GAS", "^GSPC": "S&P 500", "BTC-USD": "BITCOIN"}
+INDIA_NEWS = {"growth": ("Indian Startup Funding", "Nifty IT News"), "finance": ("RBI Policy India", "Indian Bank Stocks News"), "infra": ("India Infrastructure News", "Gold Price India")}
+GLOBAL_NEWS = {"fed": ("Federal Reserve News", "Wall Street Market Analysis"), "geo": ("Global Oil Prices OPEC", "China Economy News")}
 
 # --- PRO CSS STYLING ---
-st.markdown("""
+# Style-only st.html skips the markdown parser and lands in the event container, so it takes no layout space
+st.html("""
 <style>
     .stApp { background-color: #0E1117; }
     
@@ -39,6 +64,7 @@ st.markdown("""
         margin-bottom: 10px; 
         box-shadow: 0 4px 6px rgba(0,0,0,0.3); 
     }
+    .metric-grid { display: grid; column-gap: 1rem; }
     .metric-value { font-size: 26px; font-weight: bold; margin: 5px 0; color: #FFF; }
     .metric-delta-pos { color: #00C805; font-weight: 600; font-size: 14px; }
     .metric-delta-neg { color: #FF3B30; font-weight: 600; font-size: 14px; }
@@ -58,187 +84,427 @@ st.markdown("""
     .news-title { font-size: 15px; font-weight: 600; color: #E0E0E0; text-decoration: none; }
     .sentiment-box { padding: 15px; border-radius: 8px; text-align: center; font-weight: bold; margin-bottom: 15px; }
 </style>
-""", unsafe_allow_html=True)
+""")
 
 # --- DATA MANAGEMENT ---
+# Snapshots are rewritten atomically; small edits (e.g. watchlist adds) go to an
+# append-only "<file>.log" of {"key", "value", "seq"} records that load_json replays.
+# A snapshot is stored as {"seq", "data"}, seq being the last log record folded into it,
+# so a crash between writing the snapshot and removing the log can't replay records twice.
 def load_json(filename, default):
+    data, seq = default, 0
     if os.path.exists(filename):
         try:
-            with open(filename, 'r') as f:
-                return json.load(f)
+            with open(filename, 'rb') as f:
+                data = orjson.loads(f.read())
         except:
             return default
-    return default
+        if isinstance(data, dict) and data.keys() == {"seq", "data"}: seq, data = data["seq"], data["data"]
+    if os.path.exists(filename + ".log"):
+        with open(filename + ".log", 'rb') as f:
+            for line in f:
+                try: rec = orjson.loads(line)
+                except orjson.JSONDecodeError: continue  # torn tail from a crash mid-append
+                if rec.get('seq') is not None:
+                    if rec['seq'] <= seq: continue  # already in the snapshot
+                    seq = rec['seq']
+                (data[rec['key']] if rec.get('key') is not None else data).append(rec['value'])
+    _log_seqs()[filename] = seq
+    return data
+
+@st.cache_resource
+def _saved_digests():
+    return {}  # filename -> digest of the last snapshot this process wrote
+
+@st.cache_resource
+def _log_seqs():
+    return {}  # filename -> seq of the last record appended to (or folded from) its log
+
+@st.cache_resource
+def _fsync_queue():
+    # fsync is the slow part of a save; a daemon thread does it after the atomic rename so reruns don't wait on the disk
+    q = queue.Queue()
+    def drain():
+        while True:
+            path = q.get()
+            try:
+                fd = os.open(path, os.O_RDONLY)
+                try: os.fsync(fd)
+                finally: os.close(fd)
+            except OSError: pass
+    threading.Thread(target=drain, daemon=True, name='mr-fsync').start()
+    return q
+
+@st.cache_resource
+def _state_lock():
+    # Sessions run on their own threads; appends and compaction share one lock so a record can't land
+    # in the log between the snapshot being taken and the log being removed
+    return threading.RLock()
 
 def save_json(filename, data):
-    with open(filename, 'w') as f:
-        json.dump(data, f)
+    with _state_lock():
+        payload = orjson.dumps({"seq": _log_seqs().get(filename, 0), "data": data}, option=JSON_OPTS)
+        digest, saved = hashlib.blake2b(payload, digest_size=16).digest(), _saved_digests()
+        has_log = os.path.exists(filename + ".log")
+        if saved.get(filename) == digest and os.path.exists(filename) and not has_log: return
+        tmp = filename + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(payload)
+            if has_log: f.flush(); os.fsync(f.fileno())  # compaction: the snapshot must be durable before the log goes
+        os.replace(tmp, filename)
+        saved[filename] = digest
+        if has_log: os.remove(filename + ".log")
+        else: _fsync_queue().put(filename)
+
+def append_log(filename, record, data):
+    log = filename + ".log"
+    with _state_lock():
+        seqs = _log_seqs()
+        seqs[filename] = seqs.get(filename, 0) + 1
+        with open(log, 'ab') as f:
+            f.write(orjson.dumps(dict(record, seq=seqs[filename]), option=JSON_OPTS) + b"\n")
+        _fsync_queue().put(log)
+        if os.path.getsize(log) > LOG_COMPACT_BYTES: save_json(filename, data)
+
+@st.cache_resource
+def _persisted_state():
+    # Read from disk once per process. Sessions alias these objects rather than holding private copies,
+    # so one session's save can't clobber another's with a stale snapshot.
+    return {
+        "watchlist": load_json(WATCHLIST_FILE, {"india": [], "global": []}),
+        "trading": load_json(TRADING_FILE, {"india": {"cash": 1000000.0, "holdings": {}}, "global": {"cash": 100000.0, "holdings": {}}}),
+        "transactions": load_json(TRANSACTION_FILE, []),
+    }
 
-if 'watchlist' not in st.session_state: st.session_state.watchlist = load_json(WATCHLIST_FILE, {"india": [], "global": []})
-if 'trading' not in st.session_state: st.session_state.trading = load_json(TRADING_FILE, {"india": {"cash": 1000000.0, "holdings": {}}, "global": {"cash": 100000.0, "holdings": {}}})
-if 'transactions' not in st.session_state: st.session_state.transactions = load_json(TRANSACTION_FILE, [])
+if not st.session_state.get('_radar_init'):
+    st.session_state.update(_persisted_state(), _radar_init=True)
+
+# --- DISK CACHE ---
+# Survives process restarts and redeploys, unlike st.cache_*; one pickle per
+# (endpoint, key) under .cache/<endpoint>/, aged by file mtime.
+def _cache_path(endpoint, key):
+    return os.path.join(CACHE_DIR, endpoint, hashlib.md5(f"{endpoint}:{key}".encode()).hexdigest() + ".pkl")
+
+def disk_get(endpoint, key, ttl):
+    path = _cache_path(endpoint, key)
+    try:
+        if time.time() - os.path.getmtime(path) < ttl:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+    except Exception: pass
+    return None
+
+def disk_set(endpoint, key, value):
+    path = _cache_path(endpoint, key)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, 'wb') as f:
+            pickle.dump(value, f)
+        os.replace(tmp, path)
+    except OSError: pass
+
+def disk_cached(endpoint, key, ttl, fetch):
+    value = disk_get(endpoint, key, ttl)
+    if value is None:
+        value = fetch()
+        if value is not None and len(value): disk_set(endpoint, key, value)  # don't pin empty/failed responses
+    return value
 
 # --- BACKEND FUNCTIONS ---
+@st.cache_resource
+def _yf_cache_dir():
+    # yfinance keeps its tz/cookie/crumb sqlite caches beside ours; once per process, since
+    # moving it closes the open DBs. (Caching sessions like requests_cache are rejected by yfinance.)
+    path = os.path.join(CACHE_DIR, "yfinance")
+    os.makedirs(path, exist_ok=True)
+    yf.set_tz_cache_location(path)
+    return path
+
+_yf_cache_dir()
+
+@st.cache_resource
+def _io_pool():
+    # One bounded pool for all network fan-out; reruns reuse its threads and Yahoo never sees more than IO_WORKERS at once
+    return concurrent.futures.ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix='mr')
+
+@st.cache_resource(ttl=3600, max_entries=256)
+def _ticker(sym):
+    # Shared per symbol so yfinance's own per-ticker caches (news, info, statements) survive across sections and reruns
+    return yf.Ticker(sym)
 
 def get_google_rss(query): 
-    return f"https://news.google.com/rss/search?q={query.replace(' ', '%20')}&hl=en-IN&gl=IN&ceid=IN:en"
+    # Google News search ignores case and spacing; normalise so equivalent queries share one URL and cache entry
+    return f"https://news.google.com/rss/search?q={quote_plus(' '.join(query.lower().split()))}&hl=en-IN&gl=IN&ceid=IN:en"
 
-def safe_float(val):
-    try: return float(val) if val is not None else 0.0
-    except: return 0.0
+def news_groups(spec):
+    return {k: [get_google_rss(q) for q in qs] for k, qs in spec.items()}
 
-@st.cache_data(ttl=86400)
-def get_nifty50_tickers():
+def safe_float(val, _num=(int, float)):
+    if isinstance(val, _num): return float(val) if val == val else 0.0  # val == val drops NaN
+    if val is None: return 0.0
+    try: f = float(val)  # numpy ints, numeric strings, Decimal
+    except (TypeError, ValueError): return 0.0
+    return f if f == f else 0.0
+
+def nifty50_tickers():
+    # Plain disk-cached lookup, safe to call off the script thread; get_nifty50_tickers adds the in-memory layer
     fallback_list = ["RELIANCE.NS", "TCS.NS", "HDFCBANK.NS", "ICICIBANK.NS", "INFY.NS", "BHARTIARTL.NS", "ITC.NS", "SBIN.NS", "LICI.NS", "HINDUNILVR.NS"]
-    try:
+    def scrape():
         url = "https://en.wikipedia.org/wiki/NIFTY_50"
         tables = pd.read_html(url)
         for table in tables:
             if 'Symbol' in table.columns:
                 symbols = table['Symbol'].tolist()
                 return [f"{s}.NS" for s in symbols]
-        return fallback_list
+    try:
+        return disk_cached("nifty50", "wikipedia", 86400, scrape) or fallback_list
     except:
         return fallback_list
 
-@st.cache_data(ttl=600)
+@st.cache_data(ttl=86400)
+def get_nifty50_tickers():
+    return nifty50_tickers()
+
+# cache_resource hands back the cached object itself (no pickle round-trip on hit),
+# so callers of these fetchers must treat the results as read-only
+@st.cache_resource(ttl=600)
 def get_yield_curve_data():
     tickers = ["^IRX", "^FVX", "^TNX", "^TYX"]
     labels = ["3M", "5Y", "10Y", "30Y"]
     try:
-        data = yf.download(tickers, period="2d")['Close'].iloc[-1]
-        values = []
-        for t in tickers:
-            if t in data: values.append(data[t])
-            else: values.append(0)
-        return labels, values
+        # Each tenor's last valid close; a tenor missing from the download is 0 as before, an all-NaN one stays a gap
+        closes = yf.download(tickers, period="2d", progress=False)['Close'].ffill().reindex(columns=tickers, fill_value=0).to_numpy()
+        return labels, closes[-1].tolist()
     except: return [], []
 
 @st.cache_data(ttl=300)
 def get_market_movers_india():
-    tickers = get_nifty50_tickers()
-    target_tickers = tickers[:20] # Limit for speed
-    
-    def fetch_change(t):
-        try:
-            stock = yf.Ticker(t)
-            hist = stock.history(period="5d", interval="1d")
-            if len(hist) > 1:
-                curr = hist['Close'].iloc[-1]
-                prev = hist['Close'].iloc[-2]
-                chg = ((curr - prev) / prev) * 100
-                return {"Symbol": t.replace('.NS', ''), "Price": curr, "Change": chg}
-        except: return None
-    
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        results = list(executor.map(fetch_change, target_tickers))
-    
-    clean_results = [r for r in results if r is not None]
-    clean_results.sort(key=lambda x: x['Change'], reverse=True)
-    return clean_results
-
-@st.cache_data(ttl=300)
+    target_tickers = get_nifty50_tickers()[:MOVERS_COUNT] # Limit for speed
+    # Rides the batched quote path: one yf.download for all 20 instead of a history() call each
+    movers = [{"Symbol": d['symbol'].replace('.NS', ''), "Price": d['price'], "Change": d['change']} for d in get_ticker_data_parallel(target_tickers)]
+    movers.sort(key=lambda x: x['Change'], reverse=True)
+    # Sorted descending, so -change is ascending: [0, n_up) gained, [n_down, len) lost.
+    # Trimming here means it happens once per TTL rather than on every render.
+    neg = -np.fromiter((m['Change'] for m in movers), dtype=np.float64, count=len(movers))
+    n_up, n_down = np.searchsorted(neg, 0.0, side='left'), np.searchsorted(neg, 0.0, side='right')
+    return movers[:min(n_up, 5)], movers[max(n_down, len(movers) - 5):][::-1]
+
+SCREENER_FIELDS = {"currentPrice": "Price", "trailingPE": "P/E", "pegRatio": "PEG", "returnOnEquity": "ROE %", "debtToEquity": "Debt/Eq"}
+
+@st.cache_resource(ttl=300)
 def get_screener_data(tickers):
-    def fetch_metrics(t):
-        try:
-            s = yf.Ticker(t)
-            i = s.info
-            return {
-                "Ticker": t,
-                "Price": i.get('currentPrice', 0),
-                "P/E": i.get('trailingPE', 0),
-                "PEG": i.get('pegRatio', 0),
-                "ROE %": i.get('returnOnEquity', 0) * 100 if i.get('returnOnEquity') else 0,
-                "Debt/Eq": i.get('debtToEquity', 0),
-            }
+    batch = yf.Tickers(" ".join(tickers))  # one shared session/crumb for the whole scan
+    def fetch_info(t):
+        try: return disk_cached("info", t, INFO_TTL, lambda: batch.tickers[t.upper()].info)
         except: return None
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        results = list(executor.map(fetch_metrics, tickers))
-    return [r for r in results if r]
+    infos = list(_io_pool().map(fetch_info, tickers))
+    found = [(t, i) for t, i in zip(tickers, infos) if i]
+    df = pd.DataFrame([i for _, i in found], columns=list(SCREENER_FIELDS)).apply(pd.to_numeric, errors='coerce').fillna(0)
+    df['returnOnEquity'] *= 100
+    df.insert(0, 'Ticker', [t for t, _ in found])
+    return df.rename(columns=SCREENER_FIELDS)
+
+@st.cache_resource
+def _quote_store():
+    # quotes: symbol -> (fetched_at, quote or None), shared by every session and call site
+    # so overlapping ticker lists (e.g. ^NSEBANK in pulse and treemap) fetch once per TTL.
+    # inflight: symbol -> Future for a fetch already under way, so concurrent reruns wait
+    # on it instead of requesting the same symbol again.
+    return {"quotes": {}, "inflight": {}, "lock": threading.Lock()}
+
+def quote_from_history(t, last_time, closes, price, change, high, low):
+    if last_time.tzinfo is None:
+        last_time = last_time.replace(tzinfo=pytz.UTC)
+    spark = closes[np.linspace(0, len(closes) - 1, min(len(closes), SPARK_POINTS)).astype(int)]
+    return {
+        "symbol": t, 
+        "price": price, 
+        "change": change,
+        "high": high, 
+        "low": low, 
+        # sparkline only needs the shape: keep the first close plus int16 basis-point offsets
+        "hist0": float(spark[0]),
+        "hist_bp": np.clip(np.round((spark / spark[0] - 1) * 10000), -32768, 32767).astype(np.int16),
+        "last_updated": last_time,
+        "is_stale": (datetime.now(pytz.UTC) - last_time).total_seconds() > 1800
+    }
 
-@st.cache_data(ttl=300)
-def get_ticker_data_parallel(tickers):
-    def fetch(t):
-        try:
-            s = yf.Ticker(t)
-            h = s.history(period="5d", interval="1d")
-            if len(h) > 1:
-                last_time = h.index[-1]
-                if last_time.tzinfo is None:
-                    last_time = last_time.replace(tzinfo=pytz.UTC)
-                
-                now = datetime.now(pytz.UTC)
-                is_stale = (now - last_time).total_seconds() > 1800 
-                
-                return {
-                    "symbol": t, 
-                    "price": h['Close'].iloc[-1], 
-                    "change": ((h['Close'].iloc[-1]-h['Close'].iloc[-2])/h['Close'].iloc[-2])*100,
-                    "high": h['High'].iloc[-1], 
-                    "low": h['Low'].iloc[-1], 
-                    "hist": h['Close'].tolist(),
-                    "last_updated": last_time,
-                    "is_stale": is_stale
-                }
-        except: return None
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        results = [r for r in executor.map(fetch, tickers) if r]
-    return results
-
-@st.cache_data(ttl=600)
-def fetch_feed_parallel(url_list):
-    all_news = []
-    def fetch(url):
-        try:
-            f = feedparser.parse(url)
-            if hasattr(f, 'bozo') and f.bozo == 1: return []
-            return [{
-                "title": e.title, "link": e.link, 
-                "source": e.source.title if 'source' in e else "News", 
-                "date": e.published if 'published' in e else datetime.now().strftime("%Y-%m-%d"),
-                "timestamp": e.published_parsed if 'published_parsed' in e else time.localtime()
-            } for e in f.entries[:5]]
-        except: return []
-    
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        for res in executor.map(fetch, url_list): all_news.extend(res)
-    
-    all_news.sort(key=lambda x: x['timestamp'], reverse=True)
-    return all_news[:10]
+def fetch_quotes(tickers):
+    quotes = {t: disk_get("quote", t, QUOTE_TTL) for t in tickers}
+    missing = [t for t, q in quotes.items() if q is None]
+    if not missing: return quotes
+    # One batched chart request for every symbol instead of a Ticker().history() each
+    try:
+        df = yf.download(missing, period="5d", interval="1d", group_by="ticker", auto_adjust=True, ignore_tz=False, threads=True, progress=False)
+        if not isinstance(df.columns, pd.MultiIndex): df = pd.concat({missing[0]: df}, axis=1)
+        C, H, L = (df.xs(k, level=1, axis=1).reindex(columns=missing).to_numpy(np.float64) for k in ('Close', 'High', 'Low'))
+    except: return quotes
+    if len(C) < 2: return quotes
+    # Last and previous valid close per column in one pass over the [days, tickers] matrix;
+    # markets close on different holidays, so the rows differ per symbol
+    rows, cols, ok = np.arange(len(C))[:, None], np.arange(len(missing)), ~np.isnan(C)
+    last = np.where(ok, rows, -1).max(axis=0)
+    prev = np.where(ok & (rows < last), rows, -1).max(axis=0)
+    price, before = C[last, cols], C[prev, cols]
+    with np.errstate(divide='ignore', invalid='ignore'): change = (price - before) / before * 100
+    for j, t in enumerate(missing):
+        if prev[j] < 0: continue
+        quotes[t] = quote_from_history(t, df.index[last[j]], C[ok[:, j], j], price[j], change[j], H[last[j], j], L[last[j], j])
+        disk_set("quote", t, quotes[t])
+    return quotes
+
+def _claim_quotes(tickers, now):
+    # Splits stale symbols into ones this caller must fetch (now marked in flight) and futures to wait on
+    store, mine, waiting = _quote_store(), [], []
+    with store["lock"]:
+        # Expired entries would be refetched anyway; dropping them keeps one-off symbols from piling up
+        for t in [t for t, (at, _) in store["quotes"].items() if now - at > QUOTE_TTL]: del store["quotes"][t]
+        for t in dict.fromkeys(tickers):
+            if now - store["quotes"].get(t, (0, None))[0] <= QUOTE_TTL: continue
+            if t in store["inflight"]: waiting.append(store["inflight"][t])
+            else: store["inflight"][t] = concurrent.futures.Future(); mine.append(t)
+    return mine, waiting
+
+def _fill_quotes(mine, now):
+    store, fetched = _quote_store(), {}
+    try: fetched = fetch_quotes(mine)
+    finally:
+        with store["lock"]:
+            for t in mine:
+                store["quotes"][t] = (now, fetched.get(t))
+                store["inflight"].pop(t).set_result(None)
+
+def get_ticker_data_parallel(tickers, labels=None):
+    now = time.time()
+    mine, waiting = _claim_quotes(tickers, now)
+    if mine: _fill_quotes(mine, now)
+    if waiting: concurrent.futures.wait(waiting, timeout=30)
+    quotes = _quote_store()["quotes"]
+    out = [quotes[t][1] for t in tickers if quotes.get(t, (0, None))[1]]
+    # Stored quotes are shared; relabelling hands back copies
+    return [dict(q, symbol=labels[q['symbol']]) if q['symbol'] in labels else q for q in out] if labels else out
+
+@st.cache_resource
+def get_http_session():
+    # Keep-alive pool shared by every feed fetch, so repeat hits on news.google.com reuse TLS connections
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=IO_WORKERS, max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=(429, 500, 502, 503, 504)))
+    session.mount("https://", adapter); session.mount("http://", adapter)
+    session.headers["User-Agent"] = "Mozilla/5.0 (market-radar)"
+    return session
+
+def parse_rss(content, limit=5):
+    # Streams plain RSS 2.0 (what Google News serves) with expat and stops after `limit` items;
+    # returns None for anything else so the caller falls back to feedparser
+    items = []
+    for _, el in ET.iterparse(io.BytesIO(content), events=('end',)):
+        if el.tag != 'item': continue
+        pub, parsed = el.findtext('pubDate'), None
+        if pub: parsed = parsedate_tz(pub)
+        items.append({
+            "title": el.findtext('title', ''), "link": el.findtext('link', ''),
+            "source": el.findtext('source') or "News",
+            "date": pub or datetime.now().strftime("%Y-%m-%d"),
+            "ts": mktime_tz(parsed) if parsed else int(time.time())
+        })
+        el.clear()
+        if len(items) == limit: break
+    return items or None
+
+def parse_feedparser(content, limit=5):
+    import feedparser
+    f = feedparser.parse(content)
+    if hasattr(f, 'bozo') and f.bozo == 1: return []
+    return [{
+        "title": e.title, "link": e.link, 
+        "source": e.source.title if 'source' in e else "News", 
+        "date": e.published if 'published' in e else datetime.now().strftime("%Y-%m-%d"),
+        "ts": calendar.timegm(e.published_parsed) if e.get('published_parsed') else int(time.time())
+    } for e in f.entries[:limit]]
+
+def fetch_feed(url, session, max_age=FEED_TTL):
+    try:
+        cached = disk_get("feeds", url, INFO_TTL)
+        if cached and time.time() - cached.get('at', 0) < max_age: return cached['entries']
+        # Conditional GET: an unchanged feed answers 304 and we skip both the body and the XML parse
+        headers = {}
+        if cached and cached['etag']: headers['If-None-Match'] = cached['etag']
+        if cached and cached['modified']: headers['If-Modified-Since'] = cached['modified']
+        resp = session.get(url, timeout=5, headers=headers)
+        if resp.status_code == 304 and cached:
+            disk_set("feeds", url, dict(cached, at=time.time()))
+            return cached['entries']
+        try: entries = parse_rss(resp.content)
+        except ET.ParseError: entries = None
+        if entries is None: entries = parse_feedparser(resp.content)
+        if entries: disk_set("feeds", url, {"etag": resp.headers.get('ETag'), "modified": resp.headers.get('Last-Modified'), "entries": entries, "at": time.time()})
+        return entries
+    except: return []
+
+@st.cache_data(ttl=FEED_TTL)
+def fetch_feed_parallel(groups):
+    # groups: {section: [url, ...]}; one call per page fetches every distinct URL together
+    urls = list(dict.fromkeys(u for us in groups.values() for u in us))
+    session = get_http_session()  # resolved here: pool workers have no ScriptRunContext for st.cache_resource
+    fetch = lambda u: fetch_feed(u, session)
+    fetched = dict(zip(urls, _io_pool().map(fetch, urls) if len(urls) > 1 else map(fetch, urls)))
+    return {k: sorted((e for u in us for e in fetched[u]), key=itemgetter('ts'), reverse=True)[:10] for k, us in groups.items()}
+
+DEEP_FIELDS = {
+    "info": (INFO_TTL, lambda s: s.info),
+    "history_1y": (3600, lambda s: s.history(period="1y")),
+    "financials": (STATEMENT_TTL, lambda s: s.financials),
+    "balance_sheet": (STATEMENT_TTL, lambda s: s.balance_sheet),
+    "major_holders": (INFO_TTL, lambda s: s.major_holders),
+    "institutional_holders": (INFO_TTL, lambda s: s.institutional_holders),
+}
 
 @st.cache_data(ttl=3600)
-def get_deep_company_data(ticker):
-    try:
-        s = yf.Ticker(ticker)
-        return s.info, s.history(period="1y"), s.financials, s.balance_sheet, s.cashflow, s.major_holders, s.institutional_holders
-    except: return None, None, None, None, None, None, None
+def get_deep_company_data(ticker, fields):
+    # Views ask only for the attributes they render; each is its own Yahoo request, so several go out together
+    s = _ticker(ticker)  # resolved on the script thread; yf.Ticker() itself makes no request
+    def fetch(f):
+        ttl, get = DEEP_FIELDS[f]
+        try: return disk_cached(f, ticker, ttl, lambda: get(s))
+        except: return None  # per field, so one failing endpoint doesn't blank the rest of the view
+    return tuple(_io_pool().map(fetch, fields)) if len(fields) > 1 else (fetch(fields[0]),)
+
+@st.cache_data(ttl=3600)
+def statement_in_cr(ticker, name, _df):
+    # Pre-formatted strings skip the per-cell Styler pass on every rerun; keyed on (ticker, name) so the frame isn't hashed
+    return _df.div(10000000).map("{:,.2f} Cr".format, na_action='ignore')
 
 # --- FEATURE 19.2 AI ENGINES ---
 
 # 1. SENTIMENT ENGINE (NLTK VADER)
+@st.cache_resource
+def get_sentiment_analyzer():
+    # NLTK and the VADER lexicon are heavy; only pay for them when the sentiment view is opened
+    import nltk
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+    try:
+        nltk.data.find('sentiment/vader_lexicon.zip')
+    except LookupError:
+        nltk.download('vader_lexicon', quiet=True)
+    return SentimentIntensityAnalyzer()
+
 @st.cache_data(ttl=3600)
 def analyze_sentiment_vader(ticker):
     try:
-        t = yf.Ticker(ticker)
-        news = t.news
-        if not news: return 0, "Neutral"
-        
-        sia = SentimentIntensityAnalyzer()
-        scores = []
-        for n in news:
-            if 'title' in n:
-                scores.append(sia.polarity_scores(n['title'])['compound'])
-        
-        if not scores: return 0, "Neutral"
+        # Newer yfinance nests the headline under 'content'; collect the titles once and score them in one pass
+        titles = [t for t in ((n.get('content') or n).get('title') for n in (_ticker(ticker).news or [])) if t]
+        if not titles: return 0, "Neutral", []
         
-        avg_score = sum(scores) / len(scores)
+        polarity = get_sentiment_analyzer().polarity_scores
+        avg_score = sum(polarity(t)['compound'] for t in titles) / len(titles)
         
         if avg_score >= 0.05: verdict = "Bullish"
         elif avg_score <= -0.05: verdict = "Bearish"
         else: verdict = "Neutral"
         
-        return avg_score, verdict
-    except: return 0, "Neutral"
+        return avg_score, verdict, titles
+    except: return 0, "Neutral", []
 
 # 3. PEER WAR ROOM ENGINE
 @st.cache_data(ttl=3600)
@@ -247,7 +513,7 @@ def get_peer_comparison_data(main_ticker, peers):
     try:
         tickers = [main_ticker] + peers
         # Download batch data for 6 months
-        df = yf.download(tickers, period="6mo")['Close']
+        df = disk_cached("peers", ",".join(tickers), 3600, lambda: yf.download(tickers, period="6mo")['Close'])
         
         # Normalize: (Price / Start_Price) * 100
         normalized = df.div(df.iloc[0]).mul(100)
@@ -264,45 +530,94 @@ def render_freshness_badge(data_list):
     else:
         st.markdown("<span class='badge-live'>● LIVE DATA</span>", unsafe_allow_html=True)
 
-def render_pro_metrics(data_list, key_prefix="metric"): 
+def spark_svg(hist, color, fill, w=100, h=35):
+    # Hand-rolled sparkline: a few points don't need a Plotly figure + JSON payload per card
+    lo, hi = float(hist.min()), float(hist.max())
+    ys = h - (hist - lo) / (hi - lo) * h if hi > lo else np.full(len(hist), h / 2)
+    pts = " ".join(f"{x:.1f},{y:.1f}" for x, y in zip(np.linspace(0, w, len(hist)), ys))
+    return (f"<svg viewBox='0 0 {w} {h}' preserveAspectRatio='none' style='width:100%; height:{h}px; display:block; margin-bottom:10px;'>"
+            f"<polygon points='0,{h} {pts} {w},{h}' fill='{fill}'/>"
+            f"<polyline points='{pts}' fill='none' stroke='{color}' stroke-width='2' vector-effect='non-scaling-stroke'/></svg>")
+
+CARD_TPL = (
+    '<div><div class="metric-container" style="border-left: 4px solid {c}; background: linear-gradient(180deg, #1E1E1E 0%, {bg} 100%);">'
+    '<div style="font-size:12px; color:#aaa; font-weight:bold;">{symbol}</div>'
+    '<div class="metric-value" style="color:{c}">{price:,.2f}</div>'
+    '<div class="{delta_cls}">{change:+.2f}%</div>'
+    '<div style="margin-top: 8px; height:4px; background:#333; position:relative;">'
+    '<div style="width:50%; height:100%; background:{c}; position:absolute;"></div></div></div>{spark}</div>'
+)
+NEWS_TPL = (
+    '<div class="news-card"><div style="display:flex; justify-content:space-between;">'
+    '<span style="font-size:10px; color:#4CAF50; font-weight:bold;">{source}</span>'
+    '<span style="font-size:10px; color:#888;">{date}</span></div>'
+    '<a href="{link}" class="news-title" target="_blank">{title}</a></div>'
+)
+
+def render_pro_metrics(data_list): 
     if not data_list: 
         st.caption("Loading..."); return
-    
-    cols = st.columns(len(data_list)) if len(data_list) <= 4 else st.columns(4)
-    for i, d in enumerate(data_list):
-        col = cols[i % 4] if i >= 4 else cols[i]
-        with col:
-            c = "#00C805" if d['change'] >= 0 else "#FF3B30"
-            bg = f"rgba({0 if d['change']>=0 else 255}, {200 if d['change']>=0 else 59}, {5 if d['change']>=0 else 48}, 0.1)"
-            
-            st.markdown(f"""
-            <div class="metric-container" style="border-left: 4px solid {c}; background: linear-gradient(180deg, #1E1E1E 0%, {bg} 100%);">
-                <div style="font-size:12px; color:#aaa; font-weight:bold;">{d['symbol']}</div>
-                <div class="metric-value" style="color:{c}">{d['price']:,.2f}</div>
-                <div class="{ 'metric-delta-pos' if d['change']>=0 else 'metric-delta-neg' }">{d['change']:+.2f}%</div>
-                <div style="margin-top: 8px; height:4px; background:#333; position:relative;">
-                    <div style="width:50%; height:100%; background:{c}; position:absolute;"></div>
-                </div>
-            </div>""", unsafe_allow_html=True)
-            
-            fig = go.Figure(data=go.Scatter(y=d['hist'], mode='lines', fill='tozeroy', line=dict(color=c, width=2), fillcolor=bg))
-            fig.update_layout(margin=dict(l=0,r=0,t=0,b=0), height=35, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', xaxis=dict(visible=False), yaxis=dict(visible=False), showlegend=False)
-            
-            st.plotly_chart(fig, use_container_width=True, config={'staticPlot': True}, key=f"{key_prefix}_chart_{d['symbol']}_{i}")
+    cards = []
+    for d in data_list:
+        up = d['change'] >= 0
+        c = "#00C805" if up else "#FF3B30"
+        bg = "rgba(0, 200, 5, 0.1)" if up else "rgba(255, 59, 48, 0.1)"
+        hist = d['hist0'] * (1 + d['hist_bp'].astype(np.float32) / 10000)
+        cards.append(CARD_TPL.format(c=c, bg=bg, symbol=d['symbol'], price=d['price'], change=d['change'],
+                                     delta_cls='metric-delta-pos' if up else 'metric-delta-neg', spark=spark_svg(hist, c, bg)))
+    # One element for the whole grid; the template is single-line HTML so markdown never sees a blank line inside it
+    st.markdown(f"<div class='metric-grid' style='grid-template-columns: repeat({min(len(cards), 4)}, 1fr);'>{''.join(cards)}</div>", unsafe_allow_html=True)
 
 def render_news(news):
     if not news: 
         st.caption("No recent updates."); return
-    for n in news:
-        display_date = n['date'][:16] if len(n['date']) > 16 else n['date']
-        st.markdown(f"""
-        <div class="news-card">
-            <div style="display:flex; justify-content:space-between;">
-                <span style="font-size:10px; color:#4CAF50; font-weight:bold;">{n['source']}</span>
-                <span style="font-size:10px; color:#888;">{display_date}</span>
-            </div>
-            <a href="{n['link']}" class="news-title" target="_blank">{n['title']}</a>
-        </div>""", unsafe_allow_html=True)
+    st.markdown("".join(NEWS_TPL.format(source=n['source'], date=n['date'][:16], link=n['link'], title=n['title']) for n in news), unsafe_allow_html=True)
+
+# The Figure is shared across sessions (no pickle copy); st.plotly_chart only reads it
+@st.cache_resource(ttl=3600, max_entries=32)
+def price_chart(ticker, _hist):
+    h = _hist.dropna(subset=['Open', 'High', 'Low', 'Close'])
+    o, hi, lo, c = (h[k].to_numpy(np.float32) for k in ('Open', 'High', 'Low', 'Close'))
+    x = (h.index.tz_localize(None) if h.index.tz is not None else h.index).to_numpy('datetime64[s]')
+    fig = go.Figure(data=[go.Candlestick(x=x, open=o, high=hi, low=lo, close=c)])
+    fig.update_layout(height=400, template="plotly_dark", xaxis_rangeslider_visible=False)
+    return fig
+
+@st.cache_resource(max_entries=16)
+def sector_treemap(title, names, changes):
+    import plotly.express as px
+    n = len(names)
+    fig = px.treemap(names=list(names), parents=[""]*n, values=np.full(n, 10, dtype=np.int8), color=np.array(changes, dtype=np.float32), labels={'color': 'Change'}, color_continuous_scale=['#FF5252', '#222', '#4CAF50'], range_color=[-2, 2])
+    fig.update_layout(height=300, margin=dict(t=30,b=0,l=0,r=0), title=title)
+    return fig
+
+@st.cache_resource(ttl=QUOTE_TTL)
+def _prefetch_quotes():
+    # Started at most once per quote TTL: warms the union of every static symbol in one background batch,
+    # then the movers universe in a second, while the first tab renders. The static set is claimed here, before any tab
+    # runs, so tab calls always join this batch instead of racing it with their own downloads.
+    now = time.time()
+    mine, _ = _claim_quotes([*INDIA_PULSE, *GLOBAL_PULSE, *ECON_PULSE, *INDIA_SECTORS.values(), *GLOBAL_SECTORS.values()], now)
+    pool, session = _io_pool(), get_http_session()  # st.cache_resource lookups stay on the script thread
+    def warm():
+        if mine: _fill_quotes(mine, now)
+        # Only after the claimed symbols have landed: a cold movers list is an untimed Wikipedia scrape, and
+        # the tabs are waiting on `mine`. Not the st.cache_data wrapper, as this thread has no ScriptRunContext.
+        try: more, _ = _claim_quotes(nifty50_tickers()[:MOVERS_COUNT], now)
+        except Exception: more = []
+        if more: _fill_quotes(more, now)
+        # Revalidate the tab feeds that would go stale before the next prefetch, so the tabs' next
+        # fetch_feed_parallel miss is served from disk. Cold misses are left to the tabs to avoid fetching twice.
+        def aging(u):
+            try: return QUOTE_TTL <= now - os.path.getmtime(_cache_path("feeds", u)) < FEED_TTL
+            except OSError: return False
+        urls = [u for spec in (INDIA_NEWS, GLOBAL_NEWS) for us in news_groups(spec).values() for u in us if aging(u)]
+        list(pool.map(lambda u: fetch_feed(u, session, max_age=0), urls))
+    t = threading.Thread(target=warm, daemon=True, name='mr-prefetch')
+    t.start()
+    return t
+
+_prefetch_quotes()
 
 # --- APP LAYOUT ---
 c_title, c_badge = st.columns([4,1])
@@ -317,42 +632,38 @@ tab_india, tab_global, tab_ceo, tab_trade, tab_analyst = st.tabs([
 # --- TAB 1: INDIA ---
 with tab_india:
     st.markdown("<div class='section-header'>📊 Market Pulse</div>", unsafe_allow_html=True)
-    tickers = ["^NSEI", "^BSESN", "^NSEBANK", "GC=F", "SI=F", "CL=F"] 
-    data = get_ticker_data_parallel(tickers)
+    data = get_ticker_data_parallel(INDIA_PULSE, INDIA_LABELS)
     with c_badge: render_freshness_badge(data)
-    label_map = {"GC=F": "GOLD", "SI=F": "SILVER", "CL=F": "CRUDE OIL", "^NSEI": "NIFTY 50", "^BSESN": "SENSEX"}
-    if data:
-        for d in data: d['symbol'] = label_map.get(d['symbol'], d['symbol'])
-        render_pro_metrics(data, key_prefix="ind_pulse")
+    if data: render_pro_metrics(data)
     if st.session_state.watchlist["india"]: 
         st.subheader("⭐ Watchlist")
-        render_pro_metrics(get_ticker_data_parallel(st.session_state.watchlist["india"]), key_prefix="ind_watch")
+        render_pro_metrics(get_ticker_data_parallel(st.session_state.watchlist["india"]))
     st.divider()
+    news = fetch_feed_parallel(news_groups(INDIA_NEWS))
     c1, c2, c3 = st.columns(3)
-    with c1: st.markdown("**🚀 Growth & Tech**"); render_news(fetch_feed_parallel([get_google_rss("Indian Startup Funding"), get_google_rss("Nifty IT News")]))
-    with c2: st.markdown("**🏦 Finance & Policy**"); render_news(fetch_feed_parallel([get_google_rss("RBI Policy India"), get_google_rss("Indian Bank Stocks News")]))
-    with c3: st.markdown("**🛢️ Commodities & Infra**"); render_news(fetch_feed_parallel([get_google_rss("India Infrastructure News"), get_google_rss("Gold Price India")]))
+    with c1: st.markdown("**🚀 Growth & Tech**"); render_news(news["growth"])
+    with c2: st.markdown("**🏦 Finance & Policy**"); render_news(news["finance"])
+    with c3: st.markdown("**🛢️ Commodities & Infra**"); render_news(news["infra"])
 
 # --- TAB 2: GLOBAL ---
 with tab_global:
     st.markdown("<div class='section-header'>🌍 Global Pulse</div>", unsafe_allow_html=True)
-    tickers = ["^GSPC", "^IXIC", "BTC-USD", "GC=F", "HG=F", "NG=F"]
-    data = get_ticker_data_parallel(tickers)
-    label_map_gl = {"HG=F": "COPPER", "NG=F": "NATURAL GAS", "^GSPC": "S&P 500", "BTC-USD": "BITCOIN"}
-    if data:
-        for d in data: d['symbol'] = label_map_gl.get(d['symbol'], d['symbol'])
-        render_pro_metrics(data, key_prefix="gl_pulse")
+    data = get_ticker_data_parallel(GLOBAL_PULSE, GLOBAL_LABELS)
+    if data: render_pro_metrics(data)
     if st.session_state.watchlist["global"]:
         st.subheader("⭐ Watchlist")
-        render_pro_metrics(get_ticker_data_parallel(st.session_state.watchlist["global"]), key_prefix="gl_watch")
+        render_pro_metrics(get_ticker_data_parallel(st.session_state.watchlist["global"]))
     st.divider()
+    news = fetch_feed_parallel(news_groups(GLOBAL_NEWS))
     c1, c2 = st.columns(2)
-    with c1: st.markdown("**🇺🇸 Wall St & Fed**"); render_news(fetch_feed_parallel([get_google_rss("Federal Reserve News"), get_google_rss("Wall Street Market Analysis")]))
-    with c2: st.markdown("**🌏 Geopolitics & Energy**"); render_news(fetch_feed_parallel([get_google_rss("Global Oil Prices OPEC"), get_google_rss("China Economy News")]))
+    with c1: st.markdown("**🇺🇸 Wall St & Fed**"); render_news(news["fed"])
+    with c2: st.markdown("**🌏 Geopolitics & Energy**"); render_news(news["geo"])
 
 # --- TAB 3: CEO RADAR ---
 with tab_ceo:
     st.markdown("<div class='section-header'>🏛️ Strategic Situation Room</div>", unsafe_allow_html=True)
+    # One batched quote fetch for every symbol on this tab; pulse and treemaps slice it locally
+    by_sym = {d['symbol']: d for d in get_ticker_data_parallel([*ECON_PULSE, *INDIA_SECTORS.values(), *GLOBAL_SECTORS.values()])}
     c_yield, c_pulse = st.columns([2, 1])
     with c_yield:
         st.subheader("⚠️ US Yield Curve (Recession Watch)")
@@ -363,9 +674,8 @@ with tab_ceo:
             st.plotly_chart(fig, use_container_width=True, key="yield_chart")
     with c_pulse:
         st.subheader("🏗️ Economic Pulse")
-        rd = get_ticker_data_parallel(["USDINR=X", "DX-Y.NYB", "^TNX"])
-        if rd:
-            pmap = {d['symbol']: d['price'] for d in rd}
+        pmap = {t: by_sym[t]['price'] for t in ECON_PULSE if t in by_sym}
+        if pmap:
             t1, t2 = st.tabs(["🇮🇳 India", "🌎 Global"])
             with t1:
                 if "USDINR=X" in pmap: st.metric("USD/INR", f"₹{pmap['USDINR=X']:.2f}")
@@ -374,11 +684,9 @@ with tab_ceo:
                 if "^TNX" in pmap: st.metric("US 10Y Yield", f"{pmap['^TNX']:.2f}%")
     st.divider()
     st.subheader("🏆 Market Movers (Dynamic Nifty 50)")
-    movers = get_market_movers_india()
-    if movers:
+    gainers, losers = get_market_movers_india()
+    if gainers or losers:
         g, l = st.columns(2)
-        gainers = [m for m in movers if m['Change'] > 0][:5]
-        losers = [m for m in movers if m['Change'] < 0][:5]
         with g:
             st.success("Top Gainers")
             for m in gainers: st.markdown(f"**{m['Symbol']}**: {m['Change']:.2f}%")
@@ -388,23 +696,22 @@ with tab_ceo:
     st.divider()
     st.subheader("🔥 Sector Performance")
     def plot_treemap(sector_dict, title):
-        sd = get_ticker_data_parallel(list(sector_dict.values()))
-        if sd:
-            df = pd.DataFrame([{"Sector": k, "Change": next((x['change'] for x in sd if x['symbol'] == v), 0)} for k, v in sector_dict.items()])
-            fig = px.treemap(df, path=['Sector'], values=[10]*len(df), color='Change', color_continuous_scale=['#FF5252', '#222', '#4CAF50'], range_color=[-2, 2])
-            fig.update_layout(height=300, margin=dict(t=30,b=0,l=0,r=0), title=title)
-            return fig
+        if any(v in by_sym for v in sector_dict.values()):
+            # Rounded to the colour scale's resolution so price ticks that don't change the picture reuse the figure
+            return sector_treemap(title, tuple(sector_dict), tuple(round(by_sym[v]['change'], 2) if v in by_sym else 0.0 for v in sector_dict.values()))
         return None
     h1, h2 = st.columns(2)
     with h1: 
-        f = plot_treemap({"Banks": "^NSEBANK", "IT": "^CNXIT", "Auto": "^CNXAUTO", "Energy": "^CNXENERGY"}, "India Sectors")
+        f = plot_treemap(INDIA_SECTORS, "India Sectors")
         if f: st.plotly_chart(f, use_container_width=True, key="tree_in")
     with h2:
-        f = plot_treemap({"Tech": "IXN", "Energy": "IXC", "Finance": "IXG"}, "Global Sectors")
+        f = plot_treemap(GLOBAL_SECTORS, "Global Sectors")
         if f: st.plotly_chart(f, use_container_width=True, key="tree_gl")
 
 # --- TAB 4: TRADING FLOOR ---
-with tab_trade:
+# Fragments: widget changes and trades rerun only their own tab, not every tab's fetch/render
+@st.fragment
+def trading_floor():
     if 'trading' in st.session_state:
         st.markdown("<div class='section-header'>📈 Virtual Exchange</div>", unsafe_allow_html=True)
         fx_data = get_ticker_data_parallel(["USDINR=X"])
@@ -414,12 +721,8 @@ with tab_trade:
         curr = "₹" if "India" in mkt else "$"
         port = st.session_state.trading[m_key]
         c1, c2, c3 = st.columns(3)
-        c1.metric(f"Cash Available ({curr})", f"{curr}{port['cash']:,.0f}")
-        ind_val = st.session_state.trading['india']['cash'] 
-        gl_val_usd = st.session_state.trading['global']['cash'] 
-        gl_val_inr = gl_val_usd * usd_inr_rate
-        total_nw_inr = ind_val + gl_val_inr
-        with c2: st.metric("Total Net Worth (Unified)", f"₹{total_nw_inr:,.0f}", help=f"Combined India + Global (Converted @ ₹{usd_inr_rate:.2f})")
+        # Filled after the trade form, so a fill shows up without another rerun
+        cash_slot, nw_slot = c1.empty(), c2.empty()
         t_sym = st.text_input("Trade Ticker (e.g., ZOMATO)", "RELIANCE").upper()
         if m_key == "india" and not t_sym.endswith(".NS") and len(t_sym) > 0: final_ticker = f"{t_sym}.NS"
         else: final_ticker = t_sym
@@ -434,34 +737,58 @@ with tab_trade:
                 if c_btn.button("EXECUTE"):
                     val = lp * qty
                     fee = val * 0.001
-                    if act == "BUY":
-                        if port['cash'] >= (val+fee):
-                            port['cash'] -= (val+fee)
-                            if final_ticker in port['holdings']:
-                                old = port['holdings'][final_ticker]
-                                new_q = old['qty'] + qty
-                                new_avg = ((old['qty']*old['avg_price'])+val)/new_q
-                                port['holdings'][final_ticker] = {'qty': new_q, 'avg_price': new_avg}
-                            else:
-                                port['holdings'][final_ticker] = {'qty': qty, 'avg_price': lp}
-                            st.success("Bought!")
-                            save_json(TRADING_FILE, st.session_state.trading); st.rerun()
-                        else: st.error("No Funds")
-                    elif act == "SELL":
-                        if final_ticker in port['holdings'] and port['holdings'][final_ticker]['qty'] >= qty:
-                            port['cash'] += (val-fee)
-                            port['holdings'][final_ticker]['qty'] -= qty
-                            if port['holdings'][final_ticker]['qty'] == 0: del port['holdings'][final_ticker]
-                            st.success("Sold!")
-                            save_json(TRADING_FILE, st.session_state.trading); st.rerun()
-                        else: st.error("No Shares")
+                    filled = False
+                    # Sessions share one portfolio; check, debit and persist as one step so concurrent trades can't overdraw or double-sell
+                    with _state_lock():
+                        if act == "BUY":
+                            if port['cash'] >= (val+fee):
+                                port['cash'] -= (val+fee)
+                                if final_ticker in port['holdings']:
+                                    old = port['holdings'][final_ticker]
+                                    new_q = old['qty'] + qty
+                                    new_avg = ((old['qty']*old['avg_price'])+val)/new_q
+                                    port['holdings'][final_ticker] = {'qty': new_q, 'avg_price': new_avg}
+                                else:
+                                    port['holdings'][final_ticker] = {'qty': qty, 'avg_price': lp}
+                                st.success("Bought!"); filled = True
+                            else: st.error("No Funds")
+                        elif act == "SELL":
+                            if final_ticker in port['holdings'] and port['holdings'][final_ticker]['qty'] >= qty:
+                                port['cash'] += (val-fee)
+                                port['holdings'][final_ticker]['qty'] -= qty
+                                if port['holdings'][final_ticker]['qty'] == 0: del port['holdings'][final_ticker]
+                                st.success("Sold!"); filled = True
+                            else: st.error("No Shares")
+                        if filled:
+                            rec = {"ts": time.time(), "market": m_key, "ticker": final_ticker, "side": act, "qty": qty, "price": lp}
+                            st.session_state.transactions.append(rec)
+                            append_log(TRANSACTION_FILE, {"key": None, "value": rec}, st.session_state.transactions)
+                            save_json(TRADING_FILE, st.session_state.trading)
             elif t_sym: st.caption("Searching...")
+        cash_slot.metric(f"Cash Available ({curr})", f"{curr}{port['cash']:,.0f}")
+        ind_val = st.session_state.trading['india']['cash'] 
+        gl_val_usd = st.session_state.trading['global']['cash'] 
+        gl_val_inr = gl_val_usd * usd_inr_rate
+        total_nw_inr = ind_val + gl_val_inr
+        nw_slot.metric("Total Net Worth (Unified)", f"₹{total_nw_inr:,.0f}", help=f"Combined India + Global (Converted @ ₹{usd_inr_rate:.2f})")
         st.subheader("Holdings")
-        if port['holdings']:
-            st.dataframe(pd.DataFrame([{"Ticker": k, "Qty": v['qty'], "Avg": f"{curr}{v['avg_price']:.2f}"} for k,v in port['holdings'].items()]), use_container_width=True)
+        with _state_lock(): holdings = {t: dict(v) for t, v in port['holdings'].items()}  # another session may be trading
+        if holdings:
+            # Mark to market off one batched quote fetch; value and P&L are whole-array ops
+            syms, n = list(holdings), len(holdings)
+            ltp_by = {q['symbol']: q['price'] for q in get_ticker_data_parallel(syms)}
+            qty = np.fromiter((v['qty'] for v in holdings.values()), dtype=np.int64, count=n)
+            avg = np.fromiter((v['avg_price'] for v in holdings.values()), dtype=np.float64, count=n)
+            ltp = np.fromiter((ltp_by.get(t, np.nan) for t in syms), dtype=np.float64, count=n)
+            hold = pd.DataFrame({"Ticker": syms, "Qty": qty, "Avg": avg, "LTP": ltp, "Value": ltp * qty, "P&L": (ltp - avg) * qty})
+            money = f"{curr}{{:,.2f}}"
+            st.dataframe(hold.style.format({"Avg": money, "LTP": money, "Value": money, "P&L": money}, na_rep="—"), use_container_width=True)
+
+with tab_trade: trading_floor()
 
 # --- TAB 5: ANALYST LAB (UPGRADED 19.2) ---
-with tab_analyst:
+@st.fragment
+def analyst_lab():
     st.markdown("<div class='section-header'>🧠 Analyst Lab 19.2 (AI Enabled)</div>", unsafe_allow_html=True)
     mode = st.radio("Mode:", ["🧠 Deep Dive", "⚡ Screener"], horizontal=True)
     
@@ -470,7 +797,7 @@ with tab_analyst:
         if st.button("Run Scan"):
             scan_list = get_nifty50_tickers()[:30] 
             res = get_screener_data(scan_list)
-            if res: st.dataframe(pd.DataFrame(res).style.format({"Price": "{:.2f}"}), use_container_width=True)
+            if not res.empty: st.dataframe(res.style.format({"Price": "{:.2f}"}), use_container_width=True)
             
     else:
         c_in, c_view = st.columns([2, 1])
@@ -478,9 +805,10 @@ with tab_analyst:
         with c_view: view_type = st.selectbox("View:", ["Strategy Scorecards", "Deep Financials", "AI Sentiment & Peers"])
         
         if ticker:
-            info, hist, fin, bal, cash, major_holders, inst_holders = get_deep_company_data(ticker)
-            if info and not hist.empty:
-                st.metric(info.get('shortName', ticker), f"{hist['Close'].iloc[-1]:.2f}")
+            info, = get_deep_company_data(ticker, ("info",))
+            if info:
+                q = get_ticker_data_parallel([ticker])
+                st.metric(info.get('shortName', ticker), f"{q[0]['price']:.2f}" if q else "—")
                 
                 # --- FEATURE 19.2: PEER WAR ROOM (Moved Chart Here for Context) ---
                 if view_type == "AI Sentiment & Peers":
@@ -506,10 +834,11 @@ with tab_analyst:
 
                     # --- FEATURE 19.2: SENTIMENT & SMART MONEY ---
                     c_sent, c_money = st.columns(2)
+                    major_holders, inst_holders = get_deep_company_data(ticker, ("major_holders", "institutional_holders"))
                     
                     with c_sent:
                         st.subheader("🤖 AI Sentiment Engine")
-                        score, verdict = analyze_sentiment_vader(ticker)
+                        score, verdict, titles = analyze_sentiment_vader(ticker)
                         color = "#00C805" if score > 0 else "#FF3B30"
                         st.markdown(f"""
                         <div class='sentiment-box' style='background-color: {color}20; border: 1px solid {color};'>
@@ -519,10 +848,8 @@ with tab_analyst:
                         </div>
                         """, unsafe_allow_html=True)
                         st.markdown("**Latest Headlines Analyzed:**")
-                        t_obj = yf.Ticker(ticker)
-                        if t_obj.news:
-                            for n in t_obj.news[:3]:
-                                st.caption(f"• {n.get('title', 'No Title')}")
+                        if titles:
+                            for title in titles[:3]: st.caption(f"• {title}")
                         else: st.caption("No recent news found on YFinance.")
 
                     with c_money:
@@ -543,50 +870,55 @@ with tab_analyst:
 
                 elif view_type == "Strategy Scorecards":
                     st.subheader("Price Action")
-                    fig = go.Figure(data=[go.Candlestick(x=hist.index, open=hist['Open'], high=hist['High'], low=hist['Low'], close=hist['Close'])])
-                    fig.update_layout(height=400, template="plotly_dark", xaxis_rangeslider_visible=False)
-                    st.plotly_chart(fig, use_container_width=True, key="analyst_chart") 
+                    hist, = get_deep_company_data(ticker, ("history_1y",))
+                    if hist is not None and not hist.empty: st.plotly_chart(price_chart(ticker, hist), use_container_width=True, key="analyst_chart") 
                     
                     strat = st.selectbox("Framework:", ["🚀 CAN SLIM", "🪄 Magic Formula", "🏰 MOAT", "🏦 CAMELS (Bank)", "🏇 Jockey (Mgmt)", "🕵️ Scuttlebutt"])
                     
-                    def get_val(k, d=0): return safe_float(info.get(k, d))
+                    V = {k: safe_float(info.get(k)) for k in SCORECARD_KEYS}
 
                     if strat == "🚀 CAN SLIM":
                         c1, c2 = st.columns(2)
-                        eps = get_val('earningsGrowth')
+                        eps = V['earningsGrowth']
                         c1.metric("EPS Growth", f"{eps*100:.1f}%", delta="Target > 20%")
                         if eps > 0.20: st.markdown("<div class='verdict-pass'>PASS</div>", unsafe_allow_html=True)
                         else: st.markdown("<div class='verdict-fail'>FAIL</div>", unsafe_allow_html=True)
                     
                     elif strat == "🏰 MOAT":
                         c1, c2 = st.columns(2)
-                        roe = get_val('returnOnEquity')
+                        roe = V['returnOnEquity']
                         c1.metric("ROE", f"{roe*100:.1f}%", delta="Target > 15%")
                         if roe > 0.15: st.markdown("<div class='verdict-pass'>WIDE MOAT</div>", unsafe_allow_html=True)
                     
                     elif strat == "🕵️ Scuttlebutt":
                         st.markdown("<div class='method-card'><h3>🕵️ Scuttlebutt Intel (Upgraded)</h3></div>", unsafe_allow_html=True)
+                        name = info.get('shortName', ticker)
+                        news = fetch_feed_parallel({k: [get_google_rss(f"{name} {q}")] for k, q in (("legal", "fraud lawsuit"), ("mgmt", "CEO interview"), ("brand", "reviews complaints"))})
                         c1, c2, c3 = st.columns(3)
                         with c1: 
                             st.markdown("**⚖️ Legal & Governance**")
-                            render_news(fetch_feed_parallel([get_google_rss(f"{info.get('shortName', ticker)} fraud lawsuit")]))
+                            render_news(news["legal"])
                         with c2:
                             st.markdown("**👔 Management**")
-                            render_news(fetch_feed_parallel([get_google_rss(f"{info.get('shortName', ticker)} CEO interview")]))
+                            render_news(news["mgmt"])
                         with c3:
                             st.markdown("**📦 Product & Brand**")
-                            render_news(fetch_feed_parallel([get_google_rss(f"{info.get('shortName', ticker)} reviews complaints")]))
+                            render_news(news["brand"])
 
                 elif view_type == "Deep Financials":
                     st.subheader("📑 Statements (In Crores)")
-                    def to_cr(df): return df.div(10000000) if df is not None else None
+                    fin, bal = get_deep_company_data(ticker, ("financials", "balance_sheet"))
                     t1, t2 = st.tabs(["Income", "Balance"])
-                    with t1: st.dataframe(to_cr(fin).style.format("{:,.2f} Cr") if fin is not None else None, use_container_width=True)
-                    with t2: st.dataframe(to_cr(bal).style.format("{:,.2f} Cr") if bal is not None else None, use_container_width=True)
+                    with t1: st.dataframe(statement_in_cr(ticker, "financials", fin) if fin is not None else None, use_container_width=True)
+                    with t2: st.dataframe(statement_in_cr(ticker, "balance_sheet", bal) if bal is not None else None, use_container_width=True)
+
+with tab_analyst: analyst_lab()
 
 # --- SIDEBAR ---
 with st.sidebar:
     st.header("📝 Watchlist")
     it = st.text_input("Add Stock", key="wb").upper()
     if st.button("Add"): 
-        st.session_state.watchlist["india"].append(it); save_json(WATCHLIST_FILE, st.session_state.watchlist); st.rerun()
\ No newline at end of file
+        with _state_lock():
+            st.session_state.watchlist["india"].append(it); append_log(WATCHLIST_FILE, {"key": "india", "value": it}, st.session_state.watchlist)
+        st.rerun()
\ No newline at end of file